@@ -54,13 +54,12 @@ def main():
             jobs = json.load(f)
         
         for job_data in jobs:
-            job_id = store.add_job(
-                command=job_data["command"],
-                job_id=job_data["id"],
-                max_retries=job_data.get("max_retries", 3),
-                timeout=job_data.get("timeout"),
-                run_at=datetime.fromisoformat(job_data["run_at"]) if "run_at" in job_data else None
-            )
+            job_data.setdefault("max_retries", 3)
+            if "run_at" in job_data:
+                job_data["run_at"] = datetime.fromisoformat(job_data["run_at"])
+        
+        # One transaction for the whole file instead of one per job
+        for job_id in store.add_jobs_bulk(jobs):
             print(f"  ✓ {job_id}")
     except FileNotFoundError:
         print("  ⚠ example_jobs.json not found, skipping bulk enqueue")
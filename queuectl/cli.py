@@ -102,7 +102,7 @@ def list(
     limit: int = typer.Option(50, help="Max jobs to show"),
 ):
     """List jobs, optionally filtered by state."""
-    jobs = store.list_jobs(state=state, limit=limit)
+    jobs = store.list_jobs_for_display(state=state, limit=limit)
     
     if not jobs:
         console.print("[yellow]No jobs found[/yellow]")
@@ -115,16 +115,10 @@ def list(
     table.add_column("Attempts", justify="right")
     table.add_column("Created", style="dim")
     
-    for job in jobs:
+    for job_id, command, job_state, attempts, max_retries, created in jobs:
         # Truncate long commands
-        cmd = job["command"][:50] + "..." if len(job["command"]) > 50 else job["command"]
-        table.add_row(
-            job["id"],
-            cmd,
-            job["state"],
-            f"{job['attempts']}/{job['max_retries']}",
-            job["created_at"][:19],  # trim microseconds
-        )
+        cmd = command[:50] + "..." if len(command) > 50 else command
+        table.add_row(job_id, cmd, job_state, f"{attempts}/{max_retries}", created)
     
     console.print(table)
 
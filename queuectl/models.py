@@ -2,11 +2,44 @@
 Data models for jobs and configuration.
 """
 
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Optional
+from typing import Optional, Union
 from dataclasses import dataclass, field
 
+# Timestamps are stored as integer microseconds since the Unix epoch (UTC).
+# Integers compare in one CPU instruction and keep index pages small; we only
+# convert to datetime at the edges (CLI output, Job objects).
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def now_micros() -> int:
+    """Current UTC time in microseconds since the epoch."""
+    return time.time_ns() // 1000
+
+
+def to_micros(dt: datetime) -> int:
+    """Convert a datetime (naive UTC or timezone-aware) to epoch microseconds."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def from_micros(us: int) -> datetime:
+    """Convert epoch microseconds back to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=us)
+
+
+def _parse_timestamp(value: Union[int, str, datetime]) -> datetime:
+    """Accept storage rows (int), serialized jobs (ISO string) and datetimes as-is."""
+    if isinstance(value, int):
+        return from_micros(value)
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
 
 class JobState(str, Enum):
     """Job lifecycle states."""
@@ -17,12 +50,18 @@ class JobState(str, Enum):
     DEAD = "dead"  # DLQ state
 
 
-@dataclass
+# Plain dict lookup - calling JobState(value) goes through EnumMeta.__call__ per job
+_STATES = {state.value: state for state in JobState}
+
+
+@dataclass(slots=True)
 class Job:
     """
     Represents a job in the queue.
     
     We use a dataclass because they're clean and Python 3.10+ supports them well.
+    slots=True drops the per-instance __dict__ - less memory and faster attribute
+    access when materializing many jobs.
     """
     id: str
     command: str
@@ -54,17 +93,21 @@ class Job:
     
     @classmethod
     def from_dict(cls, data: dict):
-        """Create Job from dict."""
+        """Create Job from dict (a storage row or the output of to_dict)."""
+        state = _STATES.get(data["state"])
+        if state is None:
+            # Same error JobState(value) raises
+            raise ValueError(f"{data['state']!r} is not a valid JobState")
         return cls(
             id=data["id"],
             command=data["command"],
-            state=JobState(data["state"]),
+            state=state,
             attempts=data["attempts"],
             max_retries=data["max_retries"],
-            created_at=datetime.fromisoformat(data["created_at"]),
-            updated_at=datetime.fromisoformat(data["updated_at"]),
+            created_at=_parse_timestamp(data["created_at"]),
+            updated_at=_parse_timestamp(data["updated_at"]),
             error=data.get("error"),
             output=data.get("output"),
-            run_at=datetime.fromisoformat(data["run_at"]) if data.get("run_at") else None,
+            run_at=_parse_timestamp(data["run_at"]) if data.get("run_at") else None,
             timeout=data.get("timeout"),
         )
\ No newline at end of file
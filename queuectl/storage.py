@@ -5,14 +5,290 @@ We're using raw SQL because it's explicit and we want full control over locking.
 SQLAlchemy would work too, but this keeps dependencies minimal.
 """
 
+import json
+import os
+import socket
 import sqlite3
+import threading
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict
 from contextlib import contextmanager
 
-from queuectl.models import Job, JobState
+from queuectl.models import Job, JobState, now_micros, to_micros
+
+# Plain strings for the hot paths - Enum .value goes through a descriptor lookup on
+# every access. JobState stays the public API.
+_PENDING = JobState.PENDING.value
+_PROCESSING = JobState.PROCESSING.value
+_COMPLETED = JobState.COMPLETED.value
+_DEAD = JobState.DEAD.value
+
+# States add_jobs_bulk may insert in - processing rows need a lock owner, and
+# release_stale_locks can't reclaim a job that never had one
+_BULK_STATES = frozenset(state.value for state in JobState) - {_PROCESSING}
+
+# Timestamp arithmetic is done in integer microseconds (see models.now_micros)
+_SECOND = 1_000_000
+_MINUTE = 60 * _SECOND
+_DAY = 24 * 60 * _MINUTE
+
+# How long get_config trusts its cache. Config is changed by operators from another
+# process (queuectl config set), so running workers pick changes up within this.
+CONFIG_CACHE_TTL = 5.0
+
+# (job_id, due) pairs per wake-up datagram. Kept small because macOS caps Unix
+# datagrams at 2KB by default.
+WAKE_BATCH = 16
+
+# Applied once per connection, right after it's opened
+_CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;  -- Better concurrent access
+    PRAGMA synchronous=NORMAL;  -- Safe with WAL, skips an fsync per commit
+    PRAGMA temp_store=MEMORY;
+    PRAGMA busy_timeout=30000;
+    PRAGMA cache_size=-65536;  -- 64MB
+    PRAGMA wal_autocheckpoint=1000;  -- Keep the WAL from growing during big deletes
+"""
+
+# Lets SQLite read pages straight from the OS page cache instead of copying them
+# into its own; speeds up the list/stats scans on big histories
+_MMAP_PRAGMA = "PRAGMA mmap_size=268435456"  # 256MB
+
+_SQL_CREATE_JOBS = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER DEFAULT 0,
+        max_retries INTEGER DEFAULT 3,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL,
+        error TEXT,
+        output TEXT,
+        run_at INTEGER,
+        timeout INTEGER,
+        locked_by TEXT,
+        locked_at INTEGER
+    )
+"""
+
+# The whole schema, run as one script in its own transaction. Everything is
+# IF NOT EXISTS, so opening an existing database is a no-op.
+_SCHEMA_SQL = f"""
+    BEGIN IMMEDIATE;
+    
+    {_SQL_CREATE_JOBS};
+    
+    CREATE TABLE IF NOT EXISTS config (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    
+    -- Default config
+    INSERT OR IGNORE INTO config (key, value) VALUES ('max_retries', '3');
+    INSERT OR IGNORE INTO config (key, value) VALUES ('backoff_base', '2');
+    
+    CREATE INDEX IF NOT EXISTS idx_state_created ON jobs(state, created_at);
+    CREATE INDEX IF NOT EXISTS idx_run_at ON jobs(run_at);
+    
+    -- Partial indices for the worker hot path - they only hold live rows, so they
+    -- stay small no matter how many completed/dead jobs pile up
+    CREATE INDEX IF NOT EXISTS idx_pending_ready
+    ON jobs(created_at, run_at) WHERE state = 'pending';
+    CREATE INDEX IF NOT EXISTS idx_processing_locked
+    ON jobs(locked_at) WHERE state = 'processing';
+    
+    -- Per-state job counters kept up to date by triggers, so get_stats reads a
+    -- handful of rows instead of a GROUP BY over the whole jobs table
+    CREATE TABLE IF NOT EXISTS state_counts (
+        state TEXT PRIMARY KEY,
+        n INTEGER NOT NULL DEFAULT 0
+    );
+    
+    -- Backfill databases from before state_counts existed. Once the triggers are
+    -- in place every insert adds a row here, so an empty table means never counted.
+    INSERT INTO state_counts (state, n)
+    SELECT state, COUNT(*) FROM jobs
+    WHERE NOT EXISTS (SELECT 1 FROM state_counts)
+    GROUP BY state;
+    
+    CREATE TRIGGER IF NOT EXISTS jobs_count_insert AFTER INSERT ON jobs BEGIN
+        INSERT INTO state_counts (state, n) VALUES (NEW.state, 1)
+            ON CONFLICT(state) DO UPDATE SET n = n + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS jobs_count_update AFTER UPDATE OF state ON jobs
+    WHEN OLD.state <> NEW.state BEGIN
+        UPDATE state_counts SET n = n - 1 WHERE state = OLD.state;
+        INSERT INTO state_counts (state, n) VALUES (NEW.state, 1)
+            ON CONFLICT(state) DO UPDATE SET n = n + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS jobs_count_delete AFTER DELETE ON jobs BEGIN
+        UPDATE state_counts SET n = n - 1 WHERE state = OLD.state;
+    END;
+    
+    COMMIT;
+"""
+
+# UPDATE ... RETURNING lets acquire_job claim a row in a single statement
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Hot-path SQL lives in module-level constants so every call passes the exact same
+# string and hits sqlite3's per-connection statement cache instead of re-preparing.
+# States the partial indices filter on are inlined as literals - SQLite can only
+# pick a partial index when the query's WHERE clause provably implies its predicate.
+# INDEXED BY pins the plan; otherwise the planner happily falls back to the much
+# larger idx_state_created.
+_SQL_ACQUIRE_RETURNING = """
+    UPDATE jobs
+    SET state = ?, locked_by = ?, locked_at = ?, updated_at = ?
+    WHERE id = (
+        SELECT id FROM jobs INDEXED BY idx_pending_ready
+        WHERE state = 'pending'
+          AND (run_at IS NULL OR run_at <= ?)
+          AND (locked_by IS NULL OR locked_at < ?)
+        ORDER BY created_at
+        LIMIT 1
+    )
+    RETURNING *
+"""
+
+# Two-step fallback for SQLite < 3.35
+_SQL_ACQUIRE_CANDIDATES = """
+    SELECT * FROM jobs INDEXED BY idx_pending_ready
+    WHERE state = 'pending'
+      AND (run_at IS NULL OR run_at <= ?)
+      AND (locked_by IS NULL OR locked_at < ?)
+    ORDER BY created_at
+"""
+
+_SQL_ACQUIRE_SELECT = _SQL_ACQUIRE_CANDIDATES + "LIMIT 1\n"
+
+_SQL_ACQUIRE_UPDATE = """
+    UPDATE jobs
+    SET state = ?, locked_by = ?, locked_at = ?, updated_at = ?
+    WHERE id = ? AND state = ?
+"""
+
+# Batch version of the acquire statements - claims up to LIMIT jobs at once
+_SQL_ACQUIRE_BATCH_RETURNING = """
+    UPDATE jobs
+    SET state = ?, locked_by = ?, locked_at = ?, updated_at = ?
+    WHERE id IN (
+        SELECT id FROM jobs INDEXED BY idx_pending_ready
+        WHERE state = 'pending'
+          AND (run_at IS NULL OR run_at <= ?)
+          AND (locked_by IS NULL OR locked_at < ?)
+        ORDER BY created_at
+        LIMIT ?
+    )
+    RETURNING *
+"""
+
+_SQL_ACQUIRE_BATCH_SELECT = _SQL_ACQUIRE_CANDIDATES + "LIMIT ?\n"
+
+_SQL_CLAIM = """
+    UPDATE jobs
+    SET state = ?, locked_by = ?, locked_at = ?, updated_at = ?
+    WHERE id = ? AND state = 'pending' AND (run_at IS NULL OR run_at <= ?)
+"""
+
+_SQL_CLAIM_RETURNING = _SQL_CLAIM + "RETURNING *\n"
+
+_SQL_COMPLETE = """
+    UPDATE jobs
+    SET state = ?, updated_at = ?, output = ?, locked_by = NULL, locked_at = NULL
+    WHERE id = ?
+"""
+
+_SQL_INSERT_JOB = """
+    INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at, run_at, timeout)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_SELECT_JOB = "SELECT * FROM jobs WHERE id = ?"
+
+# Right-hand sides of an UPDATE see the old row, so attempts + 1 is the new count
+_SQL_FAIL_SET = """
+    UPDATE jobs
+    SET attempts = attempts + 1,
+        state = CASE WHEN attempts + 1 > max_retries THEN 'dead' ELSE 'pending' END,
+        error = ?,
+        updated_at = ?,
+        run_at = CASE WHEN attempts + 1 > max_retries THEN run_at
+                      ELSE ? + backoff_micros(?, attempts + 1) END,
+        locked_by = NULL, locked_at = NULL
+"""
+
+_SQL_FAIL = _SQL_FAIL_SET + "WHERE id = ?\n"
+
+_SQL_FAIL_RETURNING = _SQL_FAIL + "RETURNING state, attempts, run_at\n"
+
+_SQL_FAIL_ACQUIRED_RETURNING = _SQL_FAIL_SET + """
+    WHERE state = 'processing' AND locked_by = ?
+    RETURNING *
+"""
+
+_SQL_SELECT_ACQUIRED = "SELECT id FROM jobs WHERE state = 'processing' AND locked_by = ?"
+
+_SQL_RELEASE_STALE = """
+    UPDATE jobs INDEXED BY idx_processing_locked
+    SET state = ?, locked_by = NULL, locked_at = NULL, updated_at = ?
+    WHERE state = 'processing' AND locked_at < ?
+"""
+
+_SQL_RELEASE_STALE_RETURNING = _SQL_RELEASE_STALE + "RETURNING id, COALESCE(run_at, created_at) AS due\n"
+
+# Rows per cleanup transaction - bounds how long cleanup holds the write lock
+CLEANUP_BATCH_SIZE = 10000
+
+_SQL_CLEANUP_BATCH = """
+    DELETE FROM jobs
+    WHERE rowid IN (
+        SELECT rowid FROM jobs
+        WHERE state = ? AND updated_at < ?
+        LIMIT ?
+    )
+"""
+
+_SQL_SELECT_STATE = "SELECT state, created_at FROM jobs WHERE id = ?"
+
+_SQL_RETRY = """
+    UPDATE jobs
+    SET state = ?, attempts = 0, error = NULL, updated_at = ?, run_at = NULL
+    WHERE id = ?
+"""
+
+_SQL_LIST_JOBS = "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?"
+
+_SQL_LIST_JOBS_BY_STATE = "SELECT * FROM jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?"
+
+_SQL_DISPLAY_COLUMNS = """
+    SELECT id, command, state, attempts, max_retries,
+           strftime('%Y-%m-%dT%H:%M:%S', created_at / 1000000, 'unixepoch')
+    FROM jobs
+"""
+
+_SQL_DISPLAY_JOBS = _SQL_DISPLAY_COLUMNS + "ORDER BY created_at DESC LIMIT ?"
+
+_SQL_DISPLAY_JOBS_BY_STATE = _SQL_DISPLAY_COLUMNS + "WHERE state = ? ORDER BY created_at DESC LIMIT ?"
+
+_SQL_GET_STATS = "SELECT state, n FROM state_counts WHERE n > 0"
+
+_SQL_COUNT_JOBS = "SELECT COALESCE(SUM(n), 0) FROM state_counts"
+
+_SQL_COUNT_JOBS_BY_STATE = "SELECT n FROM state_counts WHERE state = ?"
+
+_SQL_GET_CONFIG = "SELECT value FROM config WHERE key = ?"
+
+_SQL_SET_CONFIG = "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)"
+
+
+def _backoff_micros(base: int, attempt: int) -> int:
+    """Exponential backoff delay for the given attempt: base ** attempt seconds."""
+    return base ** attempt * _SECOND
 
 
 class JobStore:
@@ -20,73 +296,205 @@ class JobStore:
     Thread-safe job storage with SQLite.
     
     Uses row-level locking to prevent concurrent workers from grabbing the same job.
+    Each thread keeps one long-lived connection, so the hot worker loop doesn't pay
+    for connect + PRAGMAs on every call.
     """
     
-    def __init__(self, db_path: str = "queuectl.db"):
-        self.db_path = Path(db_path)
+    def __init__(self, db_path: str = "queuectl.db", clock: Optional[Callable[[], datetime]] = None):
+        self._setup(db_path, clock)
         self._init_db()
     
-    @contextmanager
-    def _get_conn(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
+    @classmethod
+    def from_connection(
+        cls,
+        conn: sqlite3.Connection,
+        db_path: Optional[str] = None,
+        clock: Optional[Callable[[], datetime]] = None,
+    ) -> "JobStore":
+        """
+        Wrap an open connection to a database whose schema is already in place.
+        
+        Skips schema creation entirely - e.g. for a copy made with
+        Connection.backup(). The connection is only ever used by the calling
+        thread (so its check_same_thread setting doesn't matter); other threads
+        and forked children open their own from `db_path`.
+        
+        `db_path` defaults to the connection's database file. In-memory databases
+        have none, so for those it's required - pass the shared-cache URI the
+        connection was opened with.
+        """
+        if db_path is None:
+            main = next(row for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+            if not main[2]:
+                raise ValueError(
+                    "Connection is to an in-memory database; pass the URI it was opened "
+                    "with as db_path"
+                )
+            db_path = main[2]
+        store = cls.__new__(cls)
+        store._setup(db_path, clock)
+        conn.isolation_level = None
+        store._configure(conn)
+        store._local.conn = conn
+        store._local.pid = os.getpid()
+        return store
+    
+    def _setup(self, db_path: str, clock: Optional[Callable[[], datetime]]):
+        """Set up instance state (everything but the schema)."""
+        # SQLite URIs (e.g. "file:name?mode=memory&cache=shared") are passed through as-is
+        self._uri = str(db_path).startswith("file:")
+        self.db_path = str(db_path) if self._uri else Path(db_path)
+        # Returns naive UTC datetimes; lets tests move time forward instead of sleeping
+        self._clock = clock
+        self._local = threading.local()
+        # WorkerManager listens here for ids of jobs that just became runnable. Only
+        # file databases get one - nothing outside this process can open the others.
+        in_memory = self._uri or str(db_path) == ":memory:"
+        self.wake_path: Optional[Path] = None if in_memory else Path(f"{db_path}.wake")
+        self._wake_sock: Optional[socket.socket] = None
+        # key -> (value, monotonic time it was loaded)
+        self._config_cache: Dict[str, tuple] = {}
+        self._config_lock = threading.Lock()
+    
+    def _now(self) -> int:
+        """Current time in epoch microseconds, from the injected clock if there is one."""
+        if self._clock is None:
+            return now_micros()
+        return to_micros(self._clock())
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        # isolation_level=None: we manage transactions ourselves in _get_conn
+        conn = sqlite3.connect(
+            self.db_path,
+            uri=self._uri,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        self._configure(conn)
+        return conn
+    
+    @staticmethod
+    def _configure(conn: sqlite3.Connection):
+        """Per-connection setup: row factory, PRAGMAs and SQL functions."""
         conn.row_factory = sqlite3.Row
-        # Enable WAL mode for better concurrent access
-        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_CONNECTION_PRAGMAS)
+        try:
+            conn.execute(_MMAP_PRAGMA)
+        except sqlite3.Error:
+            pass  # Not supported on every platform/build - plain reads still work
+        # Lets fail_job compute the retry time inside its UPDATE
+        conn.create_function("backoff_micros", 2, _backoff_micros, deterministic=True)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's cached connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        # SQLite connections must not cross a fork - reopen in the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    @contextmanager
+    def _get_conn(self, write: bool = False):
+        """
+        Context manager for the cached connection.
+        
+        With write=True the body runs in a BEGIN IMMEDIATE transaction. Otherwise
+        statements run in autocommit mode - though single-statement reads skip this
+        and go straight to self._connection().
+        """
+        conn = self._connection()
+        
+        # Nested use (e.g. get_config called inside fail_job) joins the outer transaction
+        if not write or conn.in_transaction:
+            yield conn
+            return
+        
+        # IMMEDIATE takes the write lock up front, so contending writers queue up on
+        # busy_timeout. A deferred transaction that reads and then writes can't wait
+        # when it loses the lock upgrade race - it fails with SQLITE_BUSY at once.
+        conn.execute("BEGIN IMMEDIATE")
         try:
             yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
+        except BaseException:
+            conn.execute("ROLLBACK")
             raise
-        finally:
+        conn.execute("COMMIT")
+    
+    def _notify_ready(self, ready: List[tuple]):
+        """
+        Tell a running WorkerManager about jobs that became runnable.
+        
+        `ready` holds (job_id, due) pairs, due being COALESCE(run_at, created_at) in
+        epoch microseconds - when the job can run, and its place in line. They go out
+        as JSON datagrams to the Unix socket at wake_path after the transaction has
+        committed, so this works from any process - `queuectl enqueue` included.
+        Best effort: with no manager listening (or its buffer full) the send fails
+        and workers find the jobs by scanning instead.
+        """
+        if not ready or self.wake_path is None or not hasattr(socket, "AF_UNIX"):
+            return
+        address = str(self.wake_path)
+        try:
+            if self._wake_sock is None:
+                self._wake_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._wake_sock.setblocking(False)
+            for start in range(0, len(ready), WAKE_BATCH):
+                self._wake_sock.sendto(json.dumps(ready[start:start + WAKE_BATCH]).encode(), address)
+        except OSError:
+            pass
+    
+    def close(self):
+        """Close this thread's connection (a new one is opened on next use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
             conn.close()
+            self._local.conn = None
+        if self._wake_sock is not None:
+            self._wake_sock.close()
+            self._wake_sock = None
     
     def _init_db(self):
         """Initialize database schema."""
-        with self._get_conn() as conn:
-            # Jobs table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS jobs (
-                    id TEXT PRIMARY KEY,
-                    command TEXT NOT NULL,
-                    state TEXT NOT NULL,
-                    attempts INTEGER DEFAULT 0,
-                    max_retries INTEGER DEFAULT 3,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    error TEXT,
-                    output TEXT,
-                    run_at TEXT,
-                    timeout INTEGER,
-                    locked_by TEXT,
-                    locked_at TEXT
-                )
-            """)
-            
-            # Config table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS config (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL
-                )
-            """)
-            
-            # Set default config if not exists
-            conn.execute("""
-                INSERT OR IGNORE INTO config (key, value) VALUES ('max_retries', '3')
-            """)
-            conn.execute("""
-                INSERT OR IGNORE INTO config (key, value) VALUES ('backoff_base', '2')
-            """)
-            
-            # Create indices for performance
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_state_created ON jobs(state, created_at)
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_run_at ON jobs(run_at)
-            """)
+        conn = self._connection()
+        # Has to see the old table before the schema script adds indices to it
+        with self._get_conn(write=True):
+            self._migrate_text_timestamps(conn)
+        # One script instead of a dozen execute() calls; it manages its own transaction
+        conn.executescript(_SCHEMA_SQL)
+    
+    def _migrate_text_timestamps(self, conn: sqlite3.Connection):
+        """
+        Convert databases from older versions, which stored ISO-8601 text timestamps.
+        
+        The column affinity has to change too (TEXT would coerce our integers back
+        into strings), so the table is rebuilt. Runs once; later opens see INTEGER.
+        """
+        columns = {row["name"]: row["type"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if columns.get("created_at") != "TEXT":
+            return
+        
+        def micros(value):
+            return to_micros(datetime.fromisoformat(value)) if value else None
+        
+        conn.execute("ALTER TABLE jobs RENAME TO jobs_old")
+        conn.execute(_SQL_CREATE_JOBS)
+        rows = conn.execute("SELECT * FROM jobs_old").fetchall()
+        conn.executemany("""
+            INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at,
+                              error, output, run_at, timeout, locked_by, locked_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (row["id"], row["command"], row["state"], row["attempts"], row["max_retries"],
+             micros(row["created_at"]), micros(row["updated_at"]), row["error"], row["output"],
+             micros(row["run_at"]), row["timeout"], row["locked_by"], micros(row["locked_at"]))
+            for row in rows
+        ])
+        # Dropping the old table also drops its indices; _SCHEMA_SQL recreates them
+        conn.execute("DROP TABLE jobs_old")
     
     def add_job(
         self,
@@ -99,37 +507,73 @@ class JobStore:
         """Add a new job to the queue."""
         job_id = job_id or str(uuid.uuid4())
         max_retries = max_retries if max_retries is not None else self.get_config("max_retries")
-        now = datetime.utcnow().isoformat()
+        now = self._now()
         
-        with self._get_conn() as conn:
-            conn.execute("""
-                INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at, run_at, timeout)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (job_id, command, JobState.PENDING.value, 0, max_retries, now, now,
-                  run_at.isoformat() if run_at else None, timeout))
+        with self._get_conn(write=True) as conn:
+            conn.execute(_SQL_INSERT_JOB, (job_id, command, _PENDING, 0, max_retries,
+                                           now, now, to_micros(run_at) if run_at else None, timeout))
         
+        self._notify_ready([(job_id, to_micros(run_at) if run_at else now)])
         return job_id
     
+    def add_jobs_bulk(self, jobs: List[Dict], state: str = _PENDING) -> List[str]:
+        """
+        Add many jobs in a single transaction.
+        
+        Each dict takes the same fields as a JSON job spec: command (required), and
+        optional id, max_retries, run_at (datetime) and timeout. One commit for the
+        whole batch instead of one per job.
+        
+        `state` lets callers load jobs that already ran (imported history, test
+        fixtures); only pending jobs are announced to the workers. Any JobState but
+        processing is accepted.
+        """
+        if state not in _BULK_STATES:
+            raise ValueError(f"Can't add jobs in state {state!r}")
+        
+        default_retries = self.get_config("max_retries")
+        now = self._now()
+        
+        job_ids = []
+        rows = []
+        for job in jobs:
+            job_id = job.get("id") or str(uuid.uuid4())
+            run_at = job.get("run_at")
+            max_retries = job.get("max_retries")
+            job_ids.append(job_id)
+            rows.append((
+                job_id, job["command"], state, 0,
+                max_retries if max_retries is not None else default_retries,
+                now, now, to_micros(run_at) if run_at else None, job.get("timeout"),
+            ))
+        
+        with self._get_conn(write=True) as conn:
+            conn.executemany(_SQL_INSERT_JOB, rows)
+        
+        if state == _PENDING:
+            # rows[i][7] is run_at
+            self._notify_ready([(row[0], row[7] or now) for row in rows])
+        return job_ids
+    
     def acquire_job(self, worker_id: str) -> Optional[Dict]:
         """
         Atomically acquire the next pending job for processing.
         
-        This is where the magic happens - we use SELECT FOR UPDATE to lock the row,
-        preventing other workers from grabbing it.
+        This is where the magic happens - a single UPDATE ... RETURNING picks and
+        locks the row, so no other worker can grab it in between.
         """
-        with self._get_conn() as conn:
+        with self._get_conn(write=True) as conn:
             # Find and lock a pending job that's ready to run
-            now = datetime.utcnow().isoformat()
+            now = self._now()
+            stale_cutoff = now - 5 * _MINUTE
+            
+            if _HAS_RETURNING:
+                row = conn.execute(_SQL_ACQUIRE_RETURNING, (
+                    _PROCESSING, worker_id, now, now, now, stale_cutoff,
+                )).fetchone()
+                return dict(row) if row else None
             
-            cursor = conn.execute("""
-                SELECT * FROM jobs
-                WHERE state = ?
-                  AND (run_at IS NULL OR run_at <= ?)
-                  AND (locked_by IS NULL OR locked_at < ?)
-                ORDER BY created_at
-                LIMIT 1
-            """, (JobState.PENDING.value, now, 
-                  (datetime.utcnow() - timedelta(minutes=5)).isoformat()))
+            cursor = conn.execute(_SQL_ACQUIRE_SELECT, (now, stale_cutoff))
             
             row = cursor.fetchone()
             if not row:
@@ -138,146 +582,251 @@ class JobStore:
             job_dict = dict(row)
             
             # Lock it
-            conn.execute("""
-                UPDATE jobs
-                SET state = ?, locked_by = ?, locked_at = ?, updated_at = ?
-                WHERE id = ? AND state = ?
-            """, (JobState.PROCESSING.value, worker_id, now, now, 
-                  job_dict["id"], JobState.PENDING.value))
+            cursor = conn.execute(_SQL_ACQUIRE_UPDATE, (
+                _PROCESSING, worker_id, now, now,
+                job_dict["id"], _PENDING,
+            ))
             
             # Verify we got the lock
-            if conn.total_changes == 0:
+            if cursor.rowcount == 0:
                 return None
             
-            job_dict["state"] = JobState.PROCESSING.value
+            job_dict["state"] = _PROCESSING
             return job_dict
     
+    def acquire_jobs(self, worker_id: str, limit: int) -> List[Dict]:
+        """
+        Atomically acquire up to `limit` pending jobs, oldest first.
+        
+        Same rules as acquire_job, but one transaction and one UPDATE for the whole
+        batch - for callers that want to pull several jobs at a time.
+        """
+        with self._get_conn(write=True) as conn:
+            now = self._now()
+            stale_cutoff = now - 5 * _MINUTE
+            
+            if _HAS_RETURNING:
+                rows = conn.execute(_SQL_ACQUIRE_BATCH_RETURNING, (
+                    _PROCESSING, worker_id, now, now, now, stale_cutoff, limit,
+                )).fetchall()
+                # RETURNING doesn't promise any row order
+                return sorted((dict(row) for row in rows), key=lambda job: job["created_at"])
+            
+            # Holding the write lock, so nobody can take these between SELECT and UPDATE
+            jobs = [dict(row) for row in conn.execute(
+                _SQL_ACQUIRE_BATCH_SELECT, (now, stale_cutoff, limit)
+            )]
+            conn.executemany(_SQL_ACQUIRE_UPDATE, [
+                (_PROCESSING, worker_id, now, now, job["id"], _PENDING) for job in jobs
+            ])
+            for job in jobs:
+                job.update(state=_PROCESSING, locked_by=worker_id, locked_at=now, updated_at=now)
+            return jobs
+    
+    def claim_job(self, job_id: str, worker_id: str) -> Optional[Dict]:
+        """
+        Lock a specific job for processing, if it's still pending and due.
+        
+        Point-update counterpart to acquire_job for callers that already know which
+        job they want (see ReadyHeap in worker.py). Returns None if another worker
+        got there first.
+        """
+        now = self._now()
+        params = (_PROCESSING, worker_id, now, now, job_id, now)
+        
+        with self._get_conn(write=True) as conn:
+            if _HAS_RETURNING:
+                row = conn.execute(_SQL_CLAIM_RETURNING, params).fetchone()
+                return dict(row) if row else None
+            
+            if conn.execute(_SQL_CLAIM, params).rowcount == 0:
+                return None
+            return dict(conn.execute(_SQL_SELECT_JOB, (job_id,)).fetchone())
+    
     def complete_job(self, job_id: str, output: Optional[str] = None):
         """Mark job as completed."""
-        now = datetime.utcnow().isoformat()
+        now = self._now()
         
-        with self._get_conn() as conn:
-            conn.execute("""
-                UPDATE jobs
-                SET state = ?, updated_at = ?, output = ?, locked_by = NULL, locked_at = NULL
-                WHERE id = ?
-            """, (JobState.COMPLETED.value, now, output, job_id))
+        with self._get_conn(write=True) as conn:
+            conn.execute(_SQL_COMPLETE, (_COMPLETED, now, output, job_id))
     
-    def fail_job(self, job_id: str, error: str):
+    def fail_job(self, job_id: str, error: str) -> str:
         """
         Handle job failure with retry logic.
         
         If max retries exceeded, move to DLQ (dead state).
         Otherwise, schedule retry with exponential backoff.
+        
+        Done in a single UPDATE - the attempt count, state and retry time are all
+        computed from the row in SQL. Returns the job's new state.
         """
-        with self._get_conn() as conn:
-            cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                raise ValueError(f"Job {job_id} not found")
-            
-            job = dict(row)
-            attempts = job["attempts"] + 1
-            now = datetime.utcnow()
+        backoff_base = self.get_config("backoff_base")
+        now = self._now()
+        params = (error, now, now, backoff_base, job_id)
+        
+        with self._get_conn(write=True) as conn:
+            if _HAS_RETURNING:
+                row = conn.execute(_SQL_FAIL_RETURNING, params).fetchone()
+            elif conn.execute(_SQL_FAIL, params).rowcount:
+                row = conn.execute(_SQL_SELECT_JOB, (job_id,)).fetchone()
+            else:
+                row = None
+        
+        if not row:
+            raise ValueError(f"Job {job_id} not found")
+        if row["state"] == _PENDING:
+            self._notify_ready([(job_id, row["run_at"])])
+        return row["state"]
+    
+    def fail_acquired(self, worker_id: str, error: str) -> List[Dict]:
+        """
+        Fail the job(s) this worker currently holds, without looking up ids first.
+        
+        Same retry/DLQ rules as fail_job, in one UPDATE ... RETURNING keyed on
+        locked_by. Returns the updated jobs - empty if the worker holds nothing.
+        """
+        with self._get_conn(write=True) as conn:
+            # Read once we hold the write lock - not before a busy_timeout wait
+            backoff_base = self.get_config("backoff_base")
+            now = self._now()
             
-            if attempts > job["max_retries"]:
-                # Move to DLQ
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = ?, attempts = ?, error = ?, updated_at = ?, 
-                        locked_by = NULL, locked_at = NULL
-                    WHERE id = ?
-                """, (JobState.DEAD.value, attempts, error, now.isoformat(), job_id))
+            if _HAS_RETURNING:
+                rows = conn.execute(_SQL_FAIL_ACQUIRED_RETURNING, (
+                    error, now, now, backoff_base, worker_id,
+                )).fetchall()
             else:
-                # Schedule retry with exponential backoff
-                backoff_base = self.get_config("backoff_base")
-                delay_seconds = backoff_base ** attempts
-                retry_at = now + timedelta(seconds=delay_seconds)
-                
-                conn.execute("""
-                    UPDATE jobs
-                    SET state = ?, attempts = ?, error = ?, updated_at = ?, run_at = ?,
-                        locked_by = NULL, locked_at = NULL
-                    WHERE id = ?
-                """, (JobState.PENDING.value, attempts, error, now.isoformat(), 
-                      retry_at.isoformat(), job_id))
+                job_ids = [row["id"] for row in conn.execute(_SQL_SELECT_ACQUIRED, (worker_id,))]
+                conn.executemany(_SQL_FAIL, [
+                    (error, now, now, backoff_base, job_id) for job_id in job_ids
+                ])
+                rows = [conn.execute(_SQL_SELECT_JOB, (job_id,)).fetchone() for job_id in job_ids]
+        
+        self._notify_ready([(row["id"], row["run_at"]) for row in rows if row["state"] == _PENDING])
+        return [dict(row) for row in rows]
     
     def retry_job(self, job_id: str):
         """Move a DLQ job back to pending."""
-        with self._get_conn() as conn:
-            cursor = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,))
-            row = cursor.fetchone()
+        with self._get_conn(write=True) as conn:
+            row = conn.execute(_SQL_SELECT_STATE, (job_id,)).fetchone()
             
             if not row:
                 raise ValueError(f"Job {job_id} not found")
             
-            if row["state"] != JobState.DEAD.value:
+            if row["state"] != _DEAD:
                 raise ValueError(f"Job {job_id} is not in DLQ (state: {row['state']})")
             
-            now = datetime.utcnow().isoformat()
-            conn.execute("""
-                UPDATE jobs
-                SET state = ?, attempts = 0, error = NULL, updated_at = ?, run_at = NULL
-                WHERE id = ?
-            """, (JobState.PENDING.value, now, job_id))
+            now = self._now()
+            conn.execute(_SQL_RETRY, (_PENDING, now, job_id))
+        
+        self._notify_ready([(job_id, row["created_at"])])
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a single job by id, or None if there's no such job."""
+        row = self._connection().execute(_SQL_SELECT_JOB, (job_id,)).fetchone()
+        return dict(row) if row else None
     
     def list_jobs(self, state: Optional[str] = None, limit: int = 50) -> List[Dict]:
         """List jobs, optionally filtered by state."""
-        with self._get_conn() as conn:
-            if state:
-                cursor = conn.execute("""
-                    SELECT * FROM jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?
-                """, (state, limit))
-            else:
-                cursor = conn.execute("""
-                    SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?
-                """, (limit,))
-            
-            return [dict(row) for row in cursor.fetchall()]
+        conn = self._connection()
+        if state:
+            cursor = conn.execute(_SQL_LIST_JOBS_BY_STATE, (state, limit))
+        else:
+            cursor = conn.execute(_SQL_LIST_JOBS, (limit,))
+        
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def list_jobs_for_display(self, state: Optional[str] = None, limit: int = 50) -> List[tuple]:
+        """
+        List jobs as plain tuples for the CLI table.
+        
+        Rows are (id, command, state, attempts, max_retries, created) with created
+        already formatted by SQLite - no per-row dict or datetime in Python.
+        """
+        cursor = self._connection().cursor()
+        cursor.row_factory = None
+        if state:
+            cursor.execute(_SQL_DISPLAY_JOBS_BY_STATE, (state, limit))
+        else:
+            cursor.execute(_SQL_DISPLAY_JOBS, (limit,))
+        return cursor.fetchall()
     
     def get_stats(self) -> Dict[str, int]:
-        """Get job counts by state."""
-        with self._get_conn() as conn:
-            cursor = conn.execute("""
-                SELECT state, COUNT(*) as count FROM jobs GROUP BY state
-            """)
-            return {row["state"]: row["count"] for row in cursor.fetchall()}
+        """Get job counts by state (from the trigger-maintained state_counts table)."""
+        cursor = self._connection().execute(_SQL_GET_STATS)
+        return {row["state"]: row["n"] for row in cursor.fetchall()}
+    
+    def count_jobs(self, state: Optional[str] = None) -> int:
+        """Count jobs, optionally in one state - read from state_counts, not by scanning jobs."""
+        conn = self._connection()
+        if state:
+            row = conn.execute(_SQL_COUNT_JOBS_BY_STATE, (state,)).fetchone()
+        else:
+            row = conn.execute(_SQL_COUNT_JOBS).fetchone()
+        return row[0] if row else 0
     
     def get_config(self, key: str) -> int:
-        """Get configuration value."""
-        with self._get_conn() as conn:
-            cursor = conn.execute("SELECT value FROM config WHERE key = ?", (key,))
-            row = cursor.fetchone()
-            return int(row["value"]) if row else 3
+        """
+        Get configuration value.
+        
+        Cached in-process for CONFIG_CACHE_TTL seconds - fail_job and add_job read
+        config on every call, and it almost never changes.
+        """
+        now = time.monotonic()
+        cached = self._config_cache.get(key)
+        if cached is not None and now - cached[1] < CONFIG_CACHE_TTL:
+            return cached[0]
+        
+        row = self._connection().execute(_SQL_GET_CONFIG, (key,)).fetchone()
+        value = int(row["value"]) if row else 3
+        
+        with self._config_lock:
+            self._config_cache[key] = (value, now)
+        return value
     
     def set_config(self, key: str, value: int):
         """Set configuration value."""
-        with self._get_conn() as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)
-            """, (key, str(value)))
-    
-    def cleanup_old_jobs(self, days: int = 7) -> int:
-        """Delete completed jobs older than N days."""
-        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        
-        with self._get_conn() as conn:
-            conn.execute("""
-                DELETE FROM jobs
-                WHERE state = ? AND updated_at < ?
-            """, (JobState.COMPLETED.value, cutoff))
-            return conn.total_changes
+        with self._get_conn(write=True) as conn:
+            conn.execute(_SQL_SET_CONFIG, (key, str(value)))
+        
+        with self._config_lock:
+            self._config_cache[key] = (value, time.monotonic())
+    
+    def cleanup_old_jobs(self, days: int = 7, cutoff: Optional[datetime] = None) -> int:
+        """
+        Delete completed jobs older than N days (or last updated before `cutoff`).
+        
+        Deletes in batches of CLEANUP_BATCH_SIZE, each in its own transaction, so
+        workers can get the write lock in between instead of stalling behind one
+        huge DELETE.
+        """
+        if cutoff is None:
+            cutoff_micros = self._now() - days * _DAY
+        else:
+            cutoff_micros = to_micros(cutoff)
+        params = (_COMPLETED, cutoff_micros, CLEANUP_BATCH_SIZE)
+        
+        deleted = 0
+        while True:
+            with self._get_conn(write=True) as conn:
+                batch = conn.execute(_SQL_CLEANUP_BATCH, params).rowcount
+            deleted += batch
+            if batch < CLEANUP_BATCH_SIZE:
+                return deleted
     
     def release_stale_locks(self, minutes: int = 5):
         """Release locks held for longer than N minutes (for crashed workers)."""
-        cutoff = (datetime.utcnow() - timedelta(minutes=minutes)).isoformat()
-        now = datetime.utcnow().isoformat()
-        
-        with self._get_conn() as conn:
-            conn.execute("""
-                UPDATE jobs
-                SET state = ?, locked_by = NULL, locked_at = NULL, updated_at = ?
-                WHERE locked_at < ? AND state = ?
-            """, (JobState.PENDING.value, now, cutoff, JobState.PROCESSING.value))
-            return conn.total_changes
\ No newline at end of file
+        now = self._now()
+        cutoff = now - minutes * _MINUTE
+        
+        params = (_PENDING, now, cutoff)
+        
+        if not _HAS_RETURNING:
+            # No ids to hand out - idle workers still find these on their next rescan
+            with self._get_conn(write=True) as conn:
+                return conn.execute(_SQL_RELEASE_STALE, params).rowcount
+        
+        with self._get_conn(write=True) as conn:
+            released = conn.execute(_SQL_RELEASE_STALE_RETURNING, params).fetchall()
+        
+        self._notify_ready([(row["id"], row["due"]) for row in released])
+        return len(released)
\ No newline at end of file
@@ -2,19 +2,34 @@
 Worker processes that execute jobs.
 
 Uses multiprocessing to run multiple workers concurrently.
-Each worker polls for jobs and executes them using subprocess.
+Each worker pulls jobs from the store and executes them using subprocess.
+JobStore announces newly runnable jobs on a Unix socket next to the database, from
+whichever process made them runnable. WorkerManager listens there and routes the ids
+to per-worker dispatch queues; idle workers block on their own queue and steal from
+the others, rescanning SQLite only every RESCAN_INTERVAL in case a wake-up got lost.
+SQLite stays the source of truth - a dispatched id is only a hint until the worker
+claims the row.
 """
 
+import heapq
+import json
 import logging
 import multiprocessing
+import os
+import queue
 import signal
+import socket
 import subprocess
+import sys
+import threading
 import time
 import uuid
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
+from queuectl.models import JobState, now_micros
 from queuectl.storage import JobStore
 
 # Setup logging
@@ -25,6 +40,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Workers without a dispatch queue (start_single_worker) poll, backing off from MIN
+# to MAX while the queue stays empty
+MIN_IDLE_WAIT = 0.05
+MAX_IDLE_WAIT = 1.0
+
+# Idle workers with a dispatch queue scan SQLite this often anyway, for jobs whose
+# wake-up was lost (no manager listening at enqueue time, dispatch queue full)
+RESCAN_INTERVAL = 5.0
+
+# Bound on ids waiting in each worker's dispatch queue; overflow is picked up by
+# the SQL scan
+DISPATCH_QUEUE_SIZE = 256
+
+# How long an idle worker waits on its own queue before trying to steal
+STEAL_INTERVAL = 0.05
+
+# Only the tail of a job's stdout/stderr is kept, so chatty jobs don't balloon the
+# worker's memory or the jobs row
+OUTPUT_TAIL_BYTES = 64 * 1024
+READ_CHUNK = 4096
+
+# How often WorkerManager's sweeper releases locks left behind by crashed workers
+SWEEP_INTERVAL = 30
+STALE_LOCK_MINUTES = 5
+
+
+def _read_tail(stream, tail: deque):
+    """Drain a pipe in chunks; the bounded deque keeps only the last ones."""
+    for chunk in iter(lambda: stream.read(READ_CHUNK), b""):
+        tail.append(chunk)
+    stream.close()
+
+
+def _decode_tail(tail: deque) -> str:
+    """Join and decode captured chunks (the cut may split a character - replace it)."""
+    return b"".join(tail).decode(errors="replace")
+
+
+class ReadyHeap:
+    """
+    Process-local min-heap of (due, job_id) candidates.
+    
+    due is COALESCE(run_at, created_at): scheduled jobs and retries sort by when
+    they can run, everything else by age, as in the acquire_job scan. The earliest
+    entry also tells an idle worker how long it can sleep.
+    
+    Holds only ids dispatched (or stolen) to this worker, so workers don't race
+    each other for the same candidates. Lets a worker take those with a heap pop
+    plus a point UPDATE instead of an index range scan. Entries are only hints -
+    the claim in SQLite is what actually hands out a job.
+    """
+    
+    def __init__(self):
+        self._heap: list[tuple[int, str]] = []
+        self._ids: set[str] = set()
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def push(self, job_id: str, due: int):
+        """Add a candidate, ignoring ids already queued."""
+        if job_id not in self._ids:
+            self._ids.add(job_id)
+            heapq.heappush(self._heap, (due, job_id))
+    
+    def next_due(self) -> Optional[int]:
+        """When the earliest candidate is due, or None if there are none."""
+        return self._heap[0][0] if self._heap else None
+    
+    def pop_due(self, now: int) -> Optional[str]:
+        """Pop the earliest candidate that's due by `now`, or None."""
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        _, job_id = heapq.heappop(self._heap)
+        self._ids.discard(job_id)
+        return job_id
+
 
 class Worker:
     """
@@ -33,11 +125,30 @@ class Worker:
     Designed to be graceful - finishes current job before stopping.
     """
     
-    def __init__(self, worker_id: str, db_path: str = "queuectl.db"):
+    def __init__(
+        self,
+        worker_id: str,
+        db_path: str = "queuectl.db",
+        dispatch=None,
+        peers: tuple = (),
+        store: Optional[JobStore] = None,
+    ):
         self.worker_id = worker_id
-        self.store = JobStore(db_path)
+        # An already-open store can be passed in (tests wrap one with from_connection)
+        self.store = store if store is not None else JobStore(db_path)
         self.running = True
         self.current_job_id: Optional[str] = None
+        self.ready = ReadyHeap()
+        
+        # Pending jobs nobody dispatched (there before the workers started, or their
+        # wake-up got lost) are older than anything in the heap - see _next_job
+        self.backlog = True
+        self._rescan_at = 0.0
+        
+        # This worker's multiprocessing.Queue of (job_id, due) pairs from WorkerManager
+        # (None means plain polling), plus the other workers' queues to steal from
+        self.dispatch = dispatch
+        self.peers = peers
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGTERM, self._handle_shutdown)
@@ -48,19 +159,101 @@ class Worker:
         logger.info(f"Worker {self.worker_id} received shutdown signal")
         self.running = False
     
+    def _next_job(self) -> Optional[dict]:
+        """
+        Claim the next job: the backlog first, then dispatched candidates as they come due.
+        
+        The backlog is drained with the acquire_job scan (oldest first) until it comes
+        up empty; only then are heap candidates claimed. It's scanned again whenever
+        the heap has nothing due, and every RESCAN_INTERVAL, so a job whose wake-up
+        was lost can't be starved by a steady stream of dispatched ones.
+        
+        The heap only ever holds ids routed to this worker, so workers don't chase
+        the same candidates - every lost claim would still cost a write lock.
+        """
+        now = now_micros()
+        self._drain_dispatch()
+        while True:
+            next_due = self.ready.next_due()
+            if (self.backlog or next_due is None or next_due > now
+                    or time.monotonic() >= self._rescan_at):
+                job = self.store.acquire_job(self.worker_id)
+                if job:
+                    self.backlog = True
+                    return job
+                self.backlog = False
+                self._rescan_at = time.monotonic() + RESCAN_INTERVAL
+            
+            job_id = self.ready.pop_due(now)
+            if job_id is None:
+                return None
+            job = self.store.claim_job(job_id, self.worker_id)
+            if job:
+                return job
+    
+    def _drain_dispatch(self):
+        """Move any dispatched job ids into the heap without blocking."""
+        if self.dispatch is None:
+            return
+        while True:
+            try:
+                job_id, due = self.dispatch.get_nowait()
+            except queue.Empty:
+                return
+            self.ready.push(job_id, due)
+    
+    def _steal(self) -> Optional[tuple]:
+        """Take a (job_id, due) pair from another worker's queue, if any has one waiting."""
+        for peer in self.peers:
+            try:
+                return peer.get_nowait()
+            except queue.Empty:
+                continue
+        return None
+    
+    def _idle_timeout(self) -> float:
+        """Seconds until the next dispatched job is due, capped at RESCAN_INTERVAL."""
+        next_due = self.ready.next_due()
+        if next_due is None:
+            return RESCAN_INTERVAL
+        return min(RESCAN_INTERVAL, max(0.0, (next_due - now_micros()) / 1_000_000))
+    
+    def _wait_for_work(self, timeout: float):
+        """
+        Block until a job is dispatched or timeout, whichever comes first.
+        
+        Checks the peers' queues every STEAL_INTERVAL, so a job routed to a busy
+        worker doesn't sit there while this one idles.
+        """
+        if self.dispatch is None:
+            time.sleep(timeout)
+            return
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                item = self.dispatch.get(timeout=min(remaining, STEAL_INTERVAL))
+            except queue.Empty:
+                item = self._steal()
+            if item is not None:
+                self.ready.push(*item)
+                return
+    
     def run(self):
         """Main worker loop."""
         logger.info(f"Worker {self.worker_id} started")
+        idle_wait = MIN_IDLE_WAIT
         
         while self.running:
             try:
-                # Release stale locks from crashed workers
-                self.store.release_stale_locks()
-                
                 # Try to acquire a job
-                job = self.store.acquire_job(self.worker_id)
+                job = self._next_job()
                 
                 if job:
+                    idle_wait = MIN_IDLE_WAIT
                     self.current_job_id = job["id"]
                     logger.info(f"Processing job {job['id']}: {job['command']}")
                     
@@ -70,57 +263,97 @@ class Worker:
                         self.store.complete_job(job["id"], output)
                         logger.info(f"Job {job['id']} completed")
                     else:
-                        self.store.fail_job(job["id"], error)
+                        state = self.store.fail_job(job["id"], error)
                         logger.warning(f"Job {job['id']} failed: {error}")
+                        if state == JobState.DEAD.value:
+                            logger.warning(f"Job {job['id']} moved to DLQ")
                     
                     self.current_job_id = None
                 else:
-                    # No jobs available, sleep briefly
-                    time.sleep(1)
+                    # No jobs available - wait for a dispatch or the next scheduled job
+                    # (polling, with backoff, if there's no dispatch queue)
+                    self._wait_for_work(idle_wait if self.dispatch is None else self._idle_timeout())
+                    idle_wait = min(idle_wait * 2, MAX_IDLE_WAIT)
             
             except Exception as e:
                 logger.error(f"Worker error: {e}", exc_info=True)
                 time.sleep(5)  # Back off on errors
         
+        self.store.close()
         logger.info(f"Worker {self.worker_id} stopped")
     
     def _execute_job(self, job: dict) -> tuple[bool, Optional[str], Optional[str]]:
         """
         Execute a job command using subprocess.
         
+        stdout and stderr are drained by reader threads into bounded buffers, so only
+        the last OUTPUT_TAIL_BYTES of each is ever held in memory.
+        
+        Each job gets a fresh shell on purpose. A long-lived shell fed commands over a
+        pipe would carry cd/export/trap state from one job into the next, and a
+        timeout could only kill the whole shell rather than the one job.
+        
         Returns (success, output, error)
         """
+        timeout = job.get("timeout")
+        
         try:
-            timeout = job.get("timeout")
-            
-            # Run the command
-            result = subprocess.run(
+            process = subprocess.Popen(
                 job["command"],
                 shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                # Own process group, so a timeout kills the shell's children too
+                start_new_session=os.name == "posix",
             )
-            
-            output = result.stdout
-            error = result.stderr
-            
-            # Success if exit code is 0
-            success = result.returncode == 0
-            
-            if not success:
-                error_msg = f"Exit code {result.returncode}"
-                if error:
-                    error_msg += f": {error}"
-                return False, output, error_msg
-            
-            return True, output, None
+        except Exception as e:
+            return False, None, f"Execution error: {str(e)}"
         
+        max_chunks = OUTPUT_TAIL_BYTES // READ_CHUNK
+        stdout_tail: deque = deque(maxlen=max_chunks)
+        stderr_tail: deque = deque(maxlen=max_chunks)
+        readers = [
+            threading.Thread(target=_read_tail, args=(process.stdout, stdout_tail), daemon=True),
+            threading.Thread(target=_read_tail, args=(process.stderr, stderr_tail), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        
+        try:
+            returncode = process.wait(timeout=timeout)
         except subprocess.TimeoutExpired:
+            self._kill_job(process)
+            # Don't hang on pipes still held open by anything that escaped the kill
+            for reader in readers:
+                reader.join(timeout=1)
             return False, None, f"Job timed out after {timeout} seconds"
         
-        except Exception as e:
-            return False, None, f"Execution error: {str(e)}"
+        for reader in readers:
+            reader.join()
+        
+        output = _decode_tail(stdout_tail)
+        error = _decode_tail(stderr_tail)
+        
+        # Success if exit code is 0
+        if returncode != 0:
+            error_msg = f"Exit code {returncode}"
+            if error:
+                error_msg += f": {error}"
+            return False, output, error_msg
+        
+        return True, output, None
+    
+    @staticmethod
+    def _kill_job(process: subprocess.Popen):
+        """Kill a job's shell along with everything it started."""
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        process.wait()
 
 
 class WorkerManager:
@@ -132,33 +365,161 @@ class WorkerManager:
     
     def __init__(self, store: JobStore):
         self.store = store
+        # fork on Linux: children inherit the already-imported modules instead of
+        # re-importing queuectl from scratch like spawn does. SQLite connections
+        # can't cross a fork, so each worker still opens its own (JobStore reopens
+        # automatically when it sees a new pid). macOS and Windows keep their default.
+        self.ctx = multiprocessing.get_context("fork" if sys.platform == "linux" else None)
         self.workers: list[multiprocessing.Process] = []
-        self.shutdown_event = multiprocessing.Event()
+        self.shutdown_event = self.ctx.Event()
+        
+        # One queue of runnable job ids per worker, so idle workers don't have to poll
+        # and don't all contend on a single queue
+        self.queues: list = []
+        
+        self._sweeper: Optional[threading.Thread] = None
+        self._listener: Optional[threading.Thread] = None
+        self._wake_sock: Optional[socket.socket] = None
+        # Stops both background threads
+        self._stopping = threading.Event()
     
     def start_workers(self, count: int):
         """Start N worker processes."""
-        for i in range(count):
+        new_queues = [self.ctx.Queue(maxsize=DISPATCH_QUEUE_SIZE) for _ in range(count)]
+        self.queues.extend(new_queues)
+        
+        for i, inbox in enumerate(new_queues):
             worker_id = f"worker-{uuid.uuid4().hex[:8]}"
-            process = multiprocessing.Process(
+            peers = tuple(q for q in self.queues if q is not inbox)
+            process = self.ctx.Process(
                 target=self._worker_process,
-                args=(worker_id, self.store.db_path),
+                args=(worker_id, self.store.db_path, inbox, peers),
                 name=f"Worker-{i+1}",
             )
             process.start()
             self.workers.append(process)
         
+        self._start_wake_listener()
+        self._start_sweeper()
         logger.info(f"Started {count} workers")
     
+    def _start_sweeper(self):
+        """
+        Start the background thread that releases stale locks.
+        
+        One sweeper for the whole pool instead of every worker running the UPDATE on
+        every loop. Jobs from a crashed worker now come back within SWEEP_INTERVAL
+        after their lock goes stale rather than on the next poll - fine, since the
+        lock itself takes STALE_LOCK_MINUTES to go stale.
+        """
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stopping.clear()
+        self._sweeper = threading.Thread(target=self._sweep, name="StaleLockSweeper", daemon=True)
+        self._sweeper.start()
+    
+    def _sweep(self):
+        """Sweeper thread loop."""
+        while not self._stopping.is_set():
+            try:
+                released = self.store.release_stale_locks(minutes=STALE_LOCK_MINUTES)
+                if released:
+                    logger.info(f"Released {released} stale lock(s)")
+            except Exception as e:
+                logger.error(f"Sweeper error: {e}", exc_info=True)
+            self._stopping.wait(SWEEP_INTERVAL)
+    
+    def _start_wake_listener(self):
+        """
+        Bind the store's wake socket and start the thread that dispatches from it.
+        
+        Every JobStore on this database - the CLI's included - sends the ids of jobs
+        it makes runnable there. If the socket can't be bound (another manager owns
+        it, path too long, no Unix sockets), workers fall back to rescanning.
+        """
+        path = self.store.wake_path
+        if path is None or not hasattr(socket, "AF_UNIX"):
+            return
+        if self._listener is not None and self._listener.is_alive():
+            return
+        
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if path.exists():
+                # A leftover from a manager that died - unless one still answers there
+                try:
+                    sock.sendto(b"", str(path))
+                except ConnectionRefusedError:
+                    path.unlink()
+                else:
+                    raise OSError(f"another worker manager is listening on {path}")
+            sock.bind(str(path))
+        except OSError as e:
+            sock.close()
+            logger.warning(f"Can't listen for job wake-ups, workers will rescan instead: {e}")
+            return
+        
+        self._stopping.clear()
+        self._wake_sock = sock
+        self._listener = threading.Thread(target=self._listen, args=(sock,), name="WakeListener", daemon=True)
+        self._listener.start()
+    
+    def _listen(self, sock: socket.socket):
+        """Wake listener thread loop."""
+        while not self._stopping.is_set():
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                return
+            try:
+                ready = json.loads(data) if data else None
+            except ValueError:
+                continue
+            if ready:
+                self._dispatch(ready)
+    
+    def _stop_wake_listener(self):
+        """Stop the listener thread and remove the socket file."""
+        if self._wake_sock is None:
+            return
+        # An empty datagram unblocks the recv; the thread then sees _stopping
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as poke:
+            try:
+                poke.sendto(b"", str(self.store.wake_path))
+            except OSError:
+                pass
+        self._listener.join(timeout=1)
+        self._wake_sock.close()
+        self._wake_sock = None
+        try:
+            self.store.wake_path.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def _dispatch(self, ready: List[tuple]):
+        """Hand newly runnable (job_id, due) pairs to the workers, routed by job id."""
+        if not self.queues:
+            return
+        for job_id, due in ready:
+            try:
+                self.queues[hash(job_id) % len(self.queues)].put_nowait((job_id, due))
+            except queue.Full:
+                # That worker is behind anyway; the SQL scan will find the job
+                continue
+    
     @staticmethod
-    def _worker_process(worker_id: str, db_path: Path):
+    def _worker_process(worker_id: str, db_path: Path, dispatch, peers: tuple):
         """Worker process entry point."""
-        worker = Worker(worker_id, str(db_path))
+        worker = Worker(worker_id, str(db_path), dispatch, peers)
         worker.run()
     
     def stop_workers(self):
         """Stop all workers gracefully."""
         logger.info("Stopping workers...")
         
+        self._stopping.set()
+        self._stop_wake_listener()
+        
         for process in self.workers:
             if process.is_alive():
                 process.terminate()
@@ -175,6 +536,7 @@ class WorkerManager:
                 process.kill()
         
         self.workers.clear()
+        self.queues.clear()
         logger.info("All workers stopped")
     
     def wait(self):
@@ -194,6 +556,8 @@ class WorkerManager:
 def start_single_worker(worker_id: Optional[str] = None, db_path: str = "queuectl.db"):
     """
     Helper function to start a single worker (useful for testing).
+    
+    Note there's no stale lock sweeper here - that lives in WorkerManager.
     """
     worker_id = worker_id or f"worker-{uuid.uuid4().hex[:8]}"
     worker = Worker(worker_id, db_path)
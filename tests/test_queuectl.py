@@ -4,33 +4,125 @@ Tests for queuectl - because untested code is just a ticking time bomb.
 Run with: pytest tests/
 """
 
+import io
 import os
-import time
+import queue
+import socket
+import sqlite3
+import threading
 import uuid
-from pathlib import Path
 from datetime import datetime, timedelta
 
 import pytest
 
 from queuectl.storage import JobStore
-from queuectl.models import JobState
-from queuectl.worker import Worker
+from queuectl.models import Job, JobState, from_micros, to_micros
+from queuectl.worker import OUTPUT_TAIL_BYTES, Worker, WorkerManager
+from tests.util import wait_until
+
+
+@pytest.fixture(scope="class")
+def temp_db(tmp_path_factory):
+    """
+    Create a temporary database, shared by the tests in a class.
+    
+    tmp_path_factory dirs are unique per pytest-xdist worker, so parallel runs
+    never share a file; in-memory databases are per process anyway.
+    """
+    # pytest removes its tmp dirs itself, WAL side files included
+    return str(tmp_path_factory.mktemp("db") / "test.db")
+
+
+@pytest.fixture(scope="session")
+def template_db():
+    """An in-memory database with the schema built once, to copy from."""
+    template = JobStore(":memory:")
+    yield template._connection()
+    template.close()
+
+
+@pytest.fixture(scope="class")
+def memory_db(template_db):
+    """
+    A shared-cache in-memory database, shared by the tests in a class.
+    
+    None of these tests need the data on disk, so this skips all file I/O. The
+    database lives as long as one connection to it is open - we hold one here.
+    It starts as a page copy of template_db, so no DDL runs per class.
+    """
+    uri = f"file:queuectl-{uuid.uuid4().hex}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(uri, uri=True)
+    template_db.backup(keeper)
+    yield uri
+    keeper.close()
+
+
+@pytest.fixture(scope="class")
+def store(memory_db):
+    """Create a JobStore instance."""
+    store = JobStore.from_connection(sqlite3.connect(memory_db, uri=True), db_path=memory_db)
+    yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def _clean(store):
+    """Empty the shared database before each test - much cheaper than rebuilding the schema."""
+    with store._get_conn(write=True) as conn:
+        conn.execute("DELETE FROM jobs")
+        conn.execute("DELETE FROM config")
+    # Back to the defaults a fresh database starts with (also refreshes the config cache)
+    store.set_config("max_retries", 3)
+    store.set_config("backoff_base", 2)
+
+
+@pytest.fixture(scope="class")
+def worker(memory_db):
+    """A Worker on the shared database, for calling _execute_job directly."""
+    store = JobStore.from_connection(sqlite3.connect(memory_db, uri=True), db_path=memory_db)
+    worker = Worker("test-worker", memory_db, store=store)
+    yield worker
+    worker.store.close()
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+    
+    def __init__(self):
+        self.now = datetime.utcnow()
+    
+    def __call__(self) -> datetime:
+        return self.now
+    
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
 
 
 @pytest.fixture
-def temp_db(tmp_path):
-    """Create a temporary database for testing."""
-    db_path = tmp_path / "test.db"
-    yield str(db_path)
-    # Cleanup
-    if db_path.exists():
-        db_path.unlink()
+def clock():
+    return FakeClock()
 
 
 @pytest.fixture
-def store(temp_db):
-    """Create a JobStore instance."""
-    return JobStore(temp_db)
+def clocked_store(memory_db, clock):
+    """A JobStore on the shared database that reads time from the fake clock."""
+    store = JobStore.from_connection(
+        sqlite3.connect(memory_db, uri=True), db_path=memory_db, clock=clock,
+    )
+    yield store
+    store.close()
+
+
+def drive_to_dead(store, clock, job_id, worker_id="worker-1"):
+    """Acquire and fail a job until it lands in the DLQ. Returns how many failures it took."""
+    failures = 0
+    while store.acquire_job(worker_id):
+        store.fail_acquired(worker_id, error=f"Attempt {failures + 1} failed")
+        failures += 1
+        if store.get_job(job_id)["state"] == JobState.DEAD.value:
+            break
+        clock.advance(hours=1)  # Past any retry backoff
+    return failures
 
 
 class TestJobStore:
@@ -47,6 +139,18 @@ class TestJobStore:
         assert jobs[0]["command"] == "echo 'hello'"
         assert jobs[0]["state"] == JobState.PENDING.value
     
+    def test_list_jobs_for_display(self, store):
+        """Test the tuple rows used by the CLI list table."""
+        store.add_job(command="echo 'hello'", job_id="test-1")
+        
+        rows = store.list_jobs_for_display()
+        assert len(rows) == 1
+        job_id, command, state, attempts, max_retries, created = rows[0]
+        assert (job_id, command, state, attempts) == ("test-1", "echo 'hello'", "pending", 0)
+        assert datetime.fromisoformat(created) <= datetime.utcnow()
+        
+        assert store.list_jobs_for_display(state=JobState.DEAD.value) == []
+    
     def test_acquire_job(self, store):
         """Test job acquisition with locking."""
         store.add_job(command="sleep 1", job_id="job-1")
@@ -68,9 +172,8 @@ class TestJobStore:
         
         store.complete_job(job["id"], output="done\n")
         
-        jobs = store.list_jobs(state=JobState.COMPLETED.value)
-        assert len(jobs) == 1
-        assert jobs[0]["output"] == "done\n"
+        assert store.count_jobs(state=JobState.COMPLETED.value) == 1
+        assert store.get_job(job_id)["output"] == "done\n"
     
     def test_fail_job_with_retry(self, store):
         """Test job failure triggers retry."""
@@ -78,44 +181,141 @@ class TestJobStore:
         job_id = store.add_job(command="false", max_retries=3)
         
         job = store.acquire_job("worker-1")
-        store.fail_job(job["id"], error="Command failed")
-        
-        jobs = store.list_jobs(state=JobState.PENDING.value)
-        assert len(jobs) == 1
-        assert jobs[0]["attempts"] == 1
-        assert jobs[0]["run_at"] is not None  # Scheduled for retry
+        failed = store.fail_acquired("worker-1", error="Command failed")
+        assert [f["id"] for f in failed] == [job["id"]]
+        assert store.fail_acquired("worker-1", error="Nothing held") == []
+        
+        assert store.count_jobs(state=JobState.PENDING.value) == 1
+        job = store.get_job(job_id)
+        assert job["attempts"] == 1
+        assert job["run_at"] is not None  # Scheduled for retry
     
-    def test_fail_job_moves_to_dlq(self, store):
+    def test_fail_job_moves_to_dlq(self, clocked_store, clock):
         """Test job moves to DLQ after max retries."""
+        store = clocked_store
         job_id = store.add_job(command="false", max_retries=2)
         
-        # Fail 3 times (attempts 1, 2, 3)
-        for i in range(3):
-            job = store.acquire_job("worker-1")
-            if job:
-                store.fail_job(job["id"], error=f"Attempt {i+1} failed")
-                time.sleep(0.1)  # Small delay for retry scheduling
+        # Fails 3 times (attempts 1, 2, 3)
+        assert drive_to_dead(store, clock, job_id) == 3
         
-        jobs = store.list_jobs(state=JobState.DEAD.value)
-        assert len(jobs) == 1
-        assert jobs[0]["attempts"] == 3
+        assert store.count_jobs(state=JobState.DEAD.value) == 1
+        assert store.get_job(job_id)["attempts"] == 3
     
-    def test_retry_dlq_job(self, store):
+    def test_retry_dlq_job(self, clocked_store, clock):
         """Test retrying a job from DLQ."""
+        store = clocked_store
         job_id = store.add_job(command="false", max_retries=1)
         
         # Move to DLQ
         job = store.acquire_job("worker-1")
         store.fail_job(job["id"], error="Failed")
+        clock.advance(hours=1)
         job = store.acquire_job("worker-1")
         store.fail_job(job["id"], error="Failed again")
         
         # Retry from DLQ
         store.retry_job(job_id)
         
-        jobs = store.list_jobs(state=JobState.PENDING.value)
-        assert len(jobs) == 1
-        assert jobs[0]["attempts"] == 0  # Reset
+        assert store.count_jobs(state=JobState.PENDING.value) == 1
+        assert store.get_job(job_id)["attempts"] == 0  # Reset
+    
+    def test_get_stats(self, store):
+        """Test per-state counts follow jobs through their lifecycle."""
+        store.add_job(command="echo 1", job_id="job-1")
+        store.add_job(command="echo 2", job_id="job-2")
+        assert store.get_stats() == {"pending": 2}
+        assert store.count_jobs() == 2
+        assert store.get_job("job-1")["command"] == "echo 1"
+        assert store.get_job("no-such-job") is None
+        
+        job = store.acquire_job("worker-1")
+        store.complete_job(job["id"])
+        assert store.get_stats() == {"pending": 1, "completed": 1}
+        
+        store.cleanup_old_jobs(days=-1)
+        assert store.get_stats() == {"pending": 1}
+    
+    def test_from_connection(self, store):
+        """Test a wrapped in-memory connection needs its URI, and other threads get the same data."""
+        with pytest.raises(ValueError):
+            JobStore.from_connection(sqlite3.connect(":memory:"))
+        
+        store.add_job(command="echo 1", job_id="job-1")
+        counts = []
+        thread = threading.Thread(target=lambda: counts.append(store.count_jobs()))
+        thread.start()
+        thread.join()
+        assert counts == [1]
+    
+    def test_job_round_trip(self, store):
+        """Test Job converts storage rows (int timestamps) and its own to_dict output."""
+        job_id = store.add_job(command="echo 'hello'", run_at=datetime.utcnow())
+        
+        job = Job.from_dict(store.get_job(job_id))
+        assert job.state is JobState.PENDING
+        assert isinstance(job.created_at, datetime)
+        assert isinstance(job.run_at, datetime)
+        
+        assert Job.from_dict(job.to_dict()) == job
+        
+        with pytest.raises(ValueError):
+            Job.from_dict({**job.to_dict(), "state": "bogus"})
+    
+    def test_migrates_text_timestamps(self, tmp_path):
+        """Test a database from before integer timestamps is converted on open."""
+        db_path = tmp_path / "old.db"
+        created = datetime(2024, 1, 2, 3, 4, 5, 678901)
+        scheduled = created + timedelta(days=1)
+        
+        # The original schema, with ISO-8601 text timestamps
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE jobs (
+                id TEXT PRIMARY KEY, command TEXT NOT NULL, state TEXT NOT NULL,
+                attempts INTEGER DEFAULT 0, max_retries INTEGER DEFAULT 3,
+                created_at TEXT NOT NULL, updated_at TEXT NOT NULL,
+                error TEXT, output TEXT, run_at TEXT, timeout INTEGER,
+                locked_by TEXT, locked_at TEXT
+            );
+            CREATE TABLE config (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE INDEX idx_state_created ON jobs(state, created_at);
+            CREATE INDEX idx_run_at ON jobs(run_at);
+        """)
+        conn.executemany(
+            "INSERT INTO jobs (id, command, state, created_at, updated_at, run_at, output) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("pending-1", "echo 1", "pending", created.isoformat(), created.isoformat(), None, None),
+                ("completed-1", "echo 2", "completed", created.isoformat(), created.isoformat(), None, "2\n"),
+                ("scheduled-1", "echo 3", "pending", created.isoformat(), created.isoformat(),
+                 scheduled.isoformat(), None),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        
+        store = JobStore(str(db_path))
+        conn = store._connection()
+        
+        types = {row["name"]: row["type"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("created_at", "updated_at", "run_at", "locked_at"):
+            assert types[column] == "INTEGER"
+        
+        assert store.count_jobs() == 3
+        scheduled_job = store.get_job("scheduled-1")
+        assert from_micros(scheduled_job["created_at"]) == created
+        assert from_micros(scheduled_job["run_at"]) == scheduled
+        assert store.get_job("pending-1")["run_at"] is None
+        assert store.get_job("completed-1")["output"] == "2\n"
+        
+        indices = {row["name"] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'jobs'"
+        )}
+        assert {"idx_state_created", "idx_run_at", "idx_pending_ready",
+                "idx_processing_locked"} <= indices
+        
+        assert store.get_stats() == {"pending": 2, "completed": 1}
+        store.close()
     
     def test_config(self, store):
         """Test configuration management."""
@@ -125,79 +325,188 @@ class TestJobStore:
         store.set_config("backoff_base", 3)
         assert store.get_config("backoff_base") == 3
     
-    def test_cleanup_old_jobs(self, store):
+    def test_cleanup_old_jobs(self, clocked_store, clock):
         """Test cleaning up old completed jobs."""
-        # Add some completed jobs
-        for i in range(5):
-            job_id = store.add_job(command=f"echo {i}")
-            job = store.acquire_job("worker-1")
-            store.complete_job(job["id"])
-        
-        # Manually update timestamps to be old
-        with store._get_conn() as conn:
-            old_time = (datetime.utcnow() - timedelta(days=10)).isoformat()
-            conn.execute("UPDATE jobs SET updated_at = ?", (old_time,))
-        
-        deleted = store.cleanup_old_jobs(days=7)
-        assert deleted == 5
+        store = clocked_store
+        store.add_jobs_bulk([{"command": f"echo {i}"} for i in range(5)],
+                            state=JobState.COMPLETED.value)
+        store.add_job(command="echo pending")
+        
+        for bad_state in ("bogus", JobState.PROCESSING.value):
+            with pytest.raises(ValueError):
+                store.add_jobs_bulk([{"command": "echo"}], state=bad_state)
+        
+        # Nothing is a week old yet
+        assert store.cleanup_old_jobs(days=7) == 0
+        
+        clock.advance(days=10)
+        assert store.cleanup_old_jobs(cutoff=clock() - timedelta(days=20)) == 0
+        assert store.cleanup_old_jobs(days=7) == 5
+        assert store.count_jobs() == 1  # Pending jobs are never cleaned up
+    
+    @pytest.mark.parametrize("count", [6, 7])  # An exact multiple of the batch size, and not
+    def test_cleanup_old_jobs_in_batches(self, clocked_store, clock, monkeypatch, count):
+        """Test cleanup keeps deleting batch after batch until one comes back short."""
+        monkeypatch.setattr("queuectl.storage.CLEANUP_BATCH_SIZE", 3)
+        store = clocked_store
+        store.add_jobs_bulk([{"command": f"echo {i}"} for i in range(count)],
+                            state=JobState.COMPLETED.value)
+        store.add_job(command="echo pending")
+        
+        clock.advance(days=10)
+        assert store.cleanup_old_jobs(days=7) == count
+        assert store.get_stats() == {"pending": 1}
+
+
+def _is_running(pid: int) -> bool:
+    """Whether a process exists and isn't just a zombie waiting to be reaped."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class FakePopen:
+    """
+    Stands in for subprocess.Popen in tests that only check _execute_job's contract.
+    
+    Knows a few commands by heart, answering the way `sh -c` would - jobs run with
+    shell=True, so even a missing binary is just the shell exiting with 127.
+    """
+    
+    RESULTS = {
+        "echo 'test'": (0, b"test\n", b""),
+        "exit 1": (1, b"", b""),
+        "thisisnotarealcommand12345": (
+            127, b"", b"sh: 1: thisisnotarealcommand12345: not found\n",
+        ),
+    }
+    
+    def __init__(self, command, **kwargs):
+        self.returncode, stdout, stderr = self.RESULTS[command]
+        self.stdout = io.BytesIO(stdout)
+        self.stderr = io.BytesIO(stderr)
+        self.pid = -1
+    
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+@pytest.fixture
+def fake_popen(monkeypatch):
+    monkeypatch.setattr("queuectl.worker.subprocess.Popen", FakePopen)
 
 
 class TestWorker:
     """Test worker functionality."""
     
-    def test_execute_successful_command(self, temp_db):
-        """Test worker executes a successful command."""
-        store = JobStore(temp_db)
-        job_id = store.add_job(command="echo 'test'")
-        
-        worker = Worker("test-worker", temp_db)
+    @pytest.mark.parametrize("command, ok, fragment", [
+        ("echo 'test'", True, "test"),  # output
+        ("exit 1", False, "Exit code 1"),
+        ("thisisnotarealcommand12345", False, "Exit code 127"),  # invalid command
+    ])
+    def test_execute(self, store, worker, fake_popen, command, ok, fragment):
+        """Test worker reports output, failures and errors."""
+        store.add_job(command=command)
         job = store.acquire_job(worker.worker_id)
         
         success, output, error = worker._execute_job(job)
         
-        assert success is True
-        assert "test" in output
-        assert error is None
+        assert success is ok
+        if ok:
+            assert fragment in output
+            assert error is None
+        else:
+            assert fragment in error
     
-    def test_execute_failing_command(self, temp_db):
-        """Test worker handles failing commands."""
-        store = JobStore(temp_db)
-        job_id = store.add_job(command="exit 1")
+    def test_execute_popen_failure(self, store, worker, monkeypatch):
+        """Test the worker reports a shell that couldn't be started at all (e.g. fork failing)."""
+        def failing_popen(command, **kwargs):
+            raise OSError(11, "Resource temporarily unavailable")
         
-        worker = Worker("test-worker", temp_db)
+        monkeypatch.setattr("queuectl.worker.subprocess.Popen", failing_popen)
+        store.add_job(command="echo 'never runs'")
         job = store.acquire_job(worker.worker_id)
         
         success, output, error = worker._execute_job(job)
         
         assert success is False
-        assert error is not None
-        assert "Exit code 1" in error
+        assert error.startswith("Execution error")
     
-    def test_execute_with_timeout(self, temp_db):
-        """Test job timeout handling."""
-        store = JobStore(temp_db)
-        job_id = store.add_job(command="sleep 10", timeout=1)
-        
-        worker = Worker("test-worker", temp_db)
+    def test_execute_keeps_output_tail(self, store, worker):
+        """Test output beyond OUTPUT_TAIL_BYTES is cut down to its end (with a real process)."""
+        size = 4 * OUTPUT_TAIL_BYTES
+        store.add_job(command=f"head -c {size} /dev/zero | tr '\\0' a; echo END")
         job = store.acquire_job(worker.worker_id)
         
         success, output, error = worker._execute_job(job)
         
-        assert success is False
-        assert "timed out" in error.lower()
+        assert success is True
+        assert 0 < len(output) <= OUTPUT_TAIL_BYTES
+        assert output.endswith("aEND\n")
     
-    def test_invalid_command(self, temp_db):
-        """Test worker handles invalid commands gracefully."""
-        store = JobStore(temp_db)
-        job_id = store.add_job(command="thisisnotarealcommand12345")
-        
-        worker = Worker("test-worker", temp_db)
+    @pytest.mark.slow
+    @pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX-only")
+    def test_execute_with_timeout(self, store, worker, tmp_path):
+        """Test a timeout kills the job's whole process group, not just the shell."""
+        pid_file = tmp_path / "child.pid"
+        store.add_job(command=f"sleep 30 & echo $! > {pid_file}; wait", timeout=1)
         job = store.acquire_job(worker.worker_id)
         
         success, output, error = worker._execute_job(job)
         
         assert success is False
-        assert error is not None
+        assert "timed out" in error.lower()
+        
+        child = int(pid_file.read_text())
+        assert wait_until(lambda: not _is_running(child), timeout=10)
+    
+    def test_next_job_drains_backlog_before_heap(self, store, memory_db, monkeypatch):
+        """Test dispatched jobs wait behind older undispatched ones, then come off the heap."""
+        old_id = store.add_job(command="echo 'never dispatched'")
+        new_id = store.add_job(command="echo 'dispatched'")
+        inbox = queue.Queue()
+        inbox.put((new_id, store.get_job(new_id)["created_at"]))
+        worker = Worker("heap-worker", memory_db, dispatch=inbox, store=store)
+        
+        assert worker._next_job()["id"] == old_id
+        assert worker._next_job()["id"] == new_id
+        assert worker._next_job() is None  # Backlog drained; the stale heap entry is dropped
+        assert worker.backlog is False
+        
+        # Backlog clear: a dispatched job is claimed straight off the heap, no scan
+        job_id = store.add_job(command="echo 'from the heap'")
+        inbox.put((job_id, store.get_job(job_id)["created_at"]))
+        monkeypatch.setattr(worker.store, "acquire_job", lambda worker_id: pytest.fail("scanned"))
+        assert worker._next_job()["id"] == job_id
+    
+    def test_run_completes_jobs(self, temp_db):
+        """Test the worker loop picks up and completes a job in the background."""
+        store = JobStore(temp_db)
+        job_id = store.add_job(command="echo 'background'")
+        
+        worker = Worker("loop-worker", temp_db)
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+        try:
+            # Generous timeout for loaded CI boxes - it returns as soon as the job is done
+            assert wait_until(
+                lambda: store.count_jobs(state=JobState.COMPLETED.value) == 1, timeout=10,
+            )
+        finally:
+            worker.running = False
+            thread.join()
+        
+        assert "background" in store.get_job(job_id)["output"]
+        store.close()
 
 
 class TestConcurrency:
@@ -205,19 +514,20 @@ class TestConcurrency:
     
     def test_multiple_workers_no_overlap(self, store):
         """Test that multiple workers don't process the same job."""
-        # Add multiple jobs
-        job_ids = [store.add_job(command=f"echo {i}") for i in range(10)]
+        # Add multiple jobs (one transaction)
+        job_ids = store.add_jobs_bulk([{"command": f"echo {i}"} for i in range(10)])
         
-        # Acquire jobs with different workers
+        # Acquire jobs with different workers, a batch at a time
         acquired = []
-        for i in range(10):
-            job = store.acquire_job(f"worker-{i}")
-            if job:
-                acquired.append(job["id"])
+        for i in range(5):
+            jobs = store.acquire_jobs(f"worker-{i}", limit=2)
+            assert all(job["locked_by"] == f"worker-{i}" for job in jobs)
+            acquired.extend(job["id"] for job in jobs)
         
         # All jobs should be acquired by different workers
         assert len(set(acquired)) == len(acquired)  # No duplicates
-        assert len(acquired) == 10
+        assert sorted(acquired) == sorted(job_ids)
+        assert store.acquire_jobs("worker-5", limit=2) == []
     
     def test_release_stale_locks(self, store):
         """Test that stale locks are released."""
@@ -229,7 +539,7 @@ class TestConcurrency:
         
         # Manually set lock time to be stale
         with store._get_conn() as conn:
-            old_time = (datetime.utcnow() - timedelta(minutes=10)).isoformat()
+            old_time = to_micros(datetime.utcnow() - timedelta(minutes=10))
             conn.execute("UPDATE jobs SET locked_at = ? WHERE id = ?", (old_time, job_id))
         
         # Release stale locks
@@ -240,36 +550,79 @@ class TestConcurrency:
         job2 = store.acquire_job("worker-2")
         assert job2 is not None
         assert job2["id"] == job_id
+    
+    def test_dispatch_routes_and_idle_worker_steals(self, store, memory_db):
+        """Test _dispatch routes by job id, and an idle worker takes work from a peer's queue."""
+        manager = WorkerManager(store)
+        mine, theirs = queue.Queue(), queue.Queue()
+        manager.queues = [mine, theirs]
+        
+        # Enough jobs that both queues get some (str hashes vary per process)
+        job_ids = []
+        while len({hash(job_id) % 2 for job_id in job_ids}) < 2:
+            job_ids.append(store.add_job(command=f"echo {len(job_ids)}"))
+        manager._dispatch([(job_id, 0) for job_id in job_ids])
+        routed = {0: [], 1: []}
+        for job_id in job_ids:
+            routed[hash(job_id) % 2].append(job_id)
+        assert [item[0] for item in mine.queue] == routed[0]
+        assert [item[0] for item in theirs.queue] == routed[1]
+        
+        # Only the peer has anything waiting
+        mine.queue.clear()
+        worker = Worker("stealing-worker", memory_db, dispatch=mine, peers=(theirs,), store=store)
+        for _ in routed[1]:
+            worker._wait_for_work(timeout=1)
+        assert theirs.empty()
+        assert sorted(worker.ready._ids) == sorted(routed[1])
+        
+        manager.stop_workers()
+        assert manager.queues == []
+    
+    @pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+    def test_enqueue_from_another_store_is_dispatched(self, temp_db):
+        """Test jobs added through a separate JobStore (like the CLI's) reach the dispatch queues."""
+        manager = WorkerManager(JobStore(temp_db))
+        inbox = queue.Queue()
+        manager.queues = [inbox]
+        manager._start_wake_listener()
+        try:
+            cli_store = JobStore(temp_db)
+            job_id = cli_store.add_job(command="echo 'from the cli'")
+            cli_store.close()
+            
+            assert wait_until(lambda: not inbox.empty())
+            dispatched_id, due = inbox.get_nowait()
+            assert dispatched_id == job_id
+            assert due == manager.store.get_job(job_id)["created_at"]
+        finally:
+            manager.stop_workers()
+        
+        assert not os.path.exists(f"{temp_db}.wake")
+        manager.store.close()
 
 
 class TestExponentialBackoff:
     """Test retry backoff behavior."""
     
-    def test_backoff_calculation(self, store):
+    def test_backoff_calculation(self, clocked_store, clock):
         """Test that retry delays follow exponential backoff."""
+        store = clocked_store
         store.set_config("backoff_base", 2)
         job_id = store.add_job(command="false", max_retries=5)
         
-        retry_times = []
-        
-        for i in range(3):
+        # Exactly 2^1, 2^2, 2^3 seconds - the clock only moves when we move it
+        for attempt in range(1, 4):
             job = store.acquire_job("worker-1")
-            if job:
-                before_fail = datetime.utcnow()
-                store.fail_job(job["id"], error=f"Attempt {i+1}")
-                
-                # Check retry time
-                jobs = store.list_jobs(state=JobState.PENDING.value)
-                if jobs:
-                    run_at = datetime.fromisoformat(jobs[0]["run_at"])
-                    delay = (run_at - before_fail).total_seconds()
-                    retry_times.append(delay)
-        
-        # Verify exponential growth: 2^1=2, 2^2=4, 2^3=8
-        assert len(retry_times) == 3
-        assert 1.5 < retry_times[0] < 2.5  # ~2 seconds
-        assert 3.5 < retry_times[1] < 4.5  # ~4 seconds
-        assert 7.5 < retry_times[2] < 8.5  # ~8 seconds
+            assert job is not None
+            store.fail_acquired("worker-1", error=f"Attempt {attempt}")
+            
+            job = store.get_job(job_id)
+            assert job["state"] == JobState.PENDING.value
+            run_at = from_micros(job["run_at"])
+            assert (run_at - clock()).total_seconds() == 2 ** attempt
+            
+            clock.advance(seconds=2 ** attempt)  # Retry is due now
 
 
 class TestScheduledJobs:
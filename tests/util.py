@@ -0,0 +1,21 @@
+"""
+Helpers shared by the tests.
+"""
+
+import time
+
+
+def wait_until(predicate, timeout: float = 2.0, interval: float = 0.005) -> bool:
+    """
+    Poll until predicate() is true or timeout seconds pass.
+
+    For waiting on something a background thread or process does - returns as soon
+    as it happens instead of sleeping a fixed worst-case amount. Returns whether
+    the predicate came true.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()